@@ -1,377 +1,234 @@
 import streamlit as st
-import pandas as pd
-from math import ceil
-from dataclasses import dataclass
+import csv
+import io
+from math import isinf
+from pathlib import Path
 
-st.set_page_config(page_title="eV Field Service | GO/NO-GO", page_icon="⚡", layout="wide")
-
-st.markdown("""
-<style>
-:root{
-  --bg: #F7F8FB;
-  --card: #FFFFFF;
-  --text: #0F172A;
-  --muted: #475569;
-  --line: #E2E8F0;
-  --brand1: #0EA5E9;
-  --brand2: #10B981;
-  --warn: #F59E0B;
-  --bad: #EF4444;
-  --good: #22C55E;
-}
-.stApp { background: var(--bg); color: var(--text); }
-.block-container { padding-top: 1.6rem; padding-bottom: 2.5rem; max-width: 1200px; }
-.hero {
-  background: linear-gradient(90deg, rgba(14,165,233,0.14) 0%, rgba(16,185,129,0.14) 100%);
-  border: 1px solid rgba(226,232,240,1);
-  border-radius: 18px;
-  padding: 18px 18px 14px 18px;
-}
-.hero h1{ font-size: 1.55rem; line-height: 1.2; margin: 0; font-weight: 850; }
-.hero p{ margin: 6px 0 0 0; color: var(--muted); font-size: 0.95rem; }
-.badge {
-  display:inline-block; padding: 4px 10px; border-radius: 999px; font-weight: 700; font-size: 0.78rem;
-  border: 1px solid var(--line); background: rgba(255,255,255,0.85); color: #0f172a;
-}
-.card { background: var(--card); border: 1px solid var(--line); border-radius: 18px; padding: 16px; }
-.card h3{ margin: 0 0 10px 0; font-size: 1.05rem; font-weight: 800; }
-.subtle { color: var(--muted); font-size: 0.92rem; }
-.pill{
-  display:inline-flex; gap: 8px; align-items:center; padding: 7px 10px; border-radius: 999px;
-  border: 1px solid var(--line); background: #fff; font-weight: 750; font-size: 0.9rem; margin-right: 8px; margin-bottom: 6px;
-}
-.pill.good{ border-color: rgba(34,197,94,0.35); background: rgba(34,197,94,0.08); }
-.pill.bad{ border-color: rgba(239,68,68,0.35); background: rgba(239,68,68,0.08); }
-.pill.warn{ border-color: rgba(245,158,11,0.35); background: rgba(245,158,11,0.08); }
-.kpiRow { display:grid; grid-template-columns: repeat(4, 1fr); gap: 12px; }
-@media (max-width: 1100px) { .kpiRow { grid-template-columns: repeat(2, 1fr); } }
-.kpi { background: var(--card); border: 1px solid var(--line); border-radius: 18px; padding: 14px 14px 10px 14px; }
-.kpi .label{ color: var(--muted); font-size: 0.83rem; margin-bottom: 2px;}
-.kpi .value{ font-size: 1.15rem; font-weight: 900; }
-.kpi .hint{ color: var(--muted); font-size: 0.78rem; margin-top: 4px; }
-.hr { height: 1px; background: var(--line); margin: 10px 0 2px 0; }
-.footer{ color: var(--muted); font-size: 0.85rem; margin-top: 8px; }
-</style>
-""", unsafe_allow_html=True)
-
-@dataclass(frozen=True)
-class Params:
-    charging_window_hours: float = 10.0
-    working_days: int = 240
-
-    ac_rotation: int = 2
-    dc_rotation: int = 6
-
-    ac_power_effective_kw: float = 11.0
-    dc30_power_kw: float = 30.0
-    dc60_power_kw: float = 60.0
-
-    ac22_acq_eur: float = 1500.0
-    ac22_ins_eur: float = 1600.0
-    dc30_acq_eur: float = 8500.0
-    dc30_ins_eur: float = 7500.0
-    dc60_acq_eur: float = 16000.0
-    dc60_ins_eur: float = 7500.0
-
-    ev_kwh_per_km: float = 0.22
-    energy_internal_eur_per_kwh: float = 0.22
-
-    diesel_km_per_l: float = 15.0
-    diesel_eur_per_l: float = 1.75
-    diesel_kgco2_per_l: float = 2.65
-
-    trees_per_ton_co2: int = 50
-    payback_threshold_years: float = 4.0
-
-    peak_factor: float = 1.25
-
-
-def estimate(N: int, km_per_vehicle_year: float, p: Params):
-    km_total_year = N * km_per_vehicle_year
-    kwh_total_year = km_total_year * p.ev_kwh_per_km
-
-    # Giorno medio (su giorni lavorativi)
-    km_per_vehicle_day = km_per_vehicle_year / float(p.working_days)
-    kwh_per_vehicle_day = km_per_vehicle_day * p.ev_kwh_per_km
-
-    kwh_total_day_avg = N * kwh_per_vehicle_day
-    kwh_total_day_peak = kwh_total_day_avg * p.peak_factor
-
-    kwh_ac_day = p.ac_power_effective_kw * p.charging_window_hours
-    kwh_dc30_day = p.dc30_power_kw * p.charging_window_hours
-    kwh_dc60_day = p.dc60_power_kw * p.charging_window_hours
-
-    needs_dc = kwh_per_vehicle_day > 55.0
-
-    if not needs_dc:
-        q_by_rotation = ceil(N / p.ac_rotation)
-        q_by_energy = ceil(kwh_total_day_peak / kwh_ac_day) if kwh_total_day_peak > 0 else 0
-        q = max(q_by_rotation, q_by_energy)
-        capex = q * (p.ac22_acq_eur + p.ac22_ins_eur)
-        sizing = dict(hardware="AC 22kW (eff. 11kW)", points=q, by_rotation=q_by_rotation, by_energy=q_by_energy, kwh_per_station_day=kwh_ac_day)
-    else:
-        use_dc60 = kwh_per_vehicle_day > 90.0
-        if use_dc60:
-            q_by_rotation = ceil(N / p.dc_rotation)
-            q_by_energy = ceil(kwh_total_day_peak / kwh_dc60_day) if kwh_total_day_peak > 0 else 0
-            q = max(q_by_rotation, q_by_energy)
-            capex = q * (p.dc60_acq_eur + p.dc60_ins_eur)
-            sizing = dict(hardware="DC 60kW", points=q, by_rotation=q_by_rotation, by_energy=q_by_energy, kwh_per_station_day=kwh_dc60_day)
-        else:
-            q_by_rotation = ceil(N / p.dc_rotation)
-            q_by_energy = ceil(kwh_total_day_peak / kwh_dc30_day) if kwh_total_day_peak > 0 else 0
-            q = max(q_by_rotation, q_by_energy)
-            capex = q * (p.dc30_acq_eur + p.dc30_ins_eur)
-            sizing = dict(hardware="DC 30kW", points=q, by_rotation=q_by_rotation, by_energy=q_by_energy, kwh_per_station_day=kwh_dc30_day)
-
-    # Economics (solo energia interna)
-    diesel_liters_year = km_total_year / p.diesel_km_per_l if p.diesel_km_per_l > 0 else 0.0
-    diesel_cost_year = diesel_liters_year * p.diesel_eur_per_l
-    ev_energy_cost_year = kwh_total_year * p.energy_internal_eur_per_kwh
-    delta_fossil_year = diesel_cost_year - ev_energy_cost_year
-
-    payback_years = (capex / delta_fossil_year) if delta_fossil_year > 0 else float("inf")
-    decision = "GO" if (delta_fossil_year > 0 and payback_years <= p.payback_threshold_years) else "NO-GO"
-
-    # ESG KPIs (baseline diesel, in questa versione "light")
-    co2_avoided_tons_year = (diesel_liters_year * p.diesel_kgco2_per_l) / 1000.0
-    co2_avoided_kg_year = co2_avoided_tons_year * 1000.0
-    co2_avoided_kg_per_vehicle_year = co2_avoided_kg_year / N
-    co2_avoided_g_per_km = (co2_avoided_kg_year * 1000.0) / km_total_year if km_total_year > 0 else 0.0
-    trees_equivalent = int(co2_avoided_tons_year * p.trees_per_ton_co2)
-
-    if co2_avoided_tons_year >= 10:
-        esg_rating = "AAA"
-    elif co2_avoided_tons_year >= 3:
-        esg_rating = "AA"
-    elif co2_avoided_tons_year >= 1:
-        esg_rating = "A"
-    else:
-        esg_rating = "B"
-
-    return {
-        "inputs": {"N": N, "km_per_vehicle_year": km_per_vehicle_year, "km_total_year": km_total_year},
-        "energy": {
-            "working_days": p.working_days,
-            "kwh_per_vehicle_day": kwh_per_vehicle_day,
-            "kwh_total_day_avg": kwh_total_day_avg,
-            "kwh_total_day_peak": kwh_total_day_peak,
-            "kwh_total_year": kwh_total_year,
-        },
-        "sizing": sizing,
-        "capex": {"capex_eur": capex},
-        "economics": {
-            "diesel_cost_year_eur": diesel_cost_year,
-            "ev_energy_cost_year_eur": ev_energy_cost_year,
-            "delta_fossil_year_eur": delta_fossil_year,
-            "payback_years_hw_only": payback_years,
-            "decision": decision,
-        },
-        "esg": {
-            "diesel_avoided_liters_year": diesel_liters_year,
-            "co2_avoided_tons_year": co2_avoided_tons_year,
-            "co2_avoided_kg_per_vehicle_year": co2_avoided_kg_per_vehicle_year,
-            "co2_avoided_g_per_km": co2_avoided_g_per_km,
-            "trees_equivalent": trees_equivalent,
-            "esg_rating": esg_rating,
-        },
-    }
+from engine import DEFAULT_PARAMS, EstimateResult, Params, estimate
 
+st.set_page_config(page_title="eV Field Service | GO/NO-GO", page_icon="⚡", layout="wide")
 
-st.markdown("""
+_TITLE_BLOCK = """
 <div class="hero">
   <div class="badge">⚡ GO/NO-GO — Fleet Electrification</div>
   <h1>Decisione rapida, numeri solidi</h1>
   <p>Inserisci <b>N veicoli</b> e <b>km annui</b>. Dimensioniamo per giorni di picco e stimiamo CAPEX, payback e KPI ESG.</p>
 </div>
-""", unsafe_allow_html=True)
-st.write("")
-
-with st.sidebar:
-    st.header("🧩 Impostazioni")
-    st.caption("Per una demo semplice, lascia i default. Apri *Avanzate* solo se vuoi rifinire le assunzioni.")
-    with st.expander("Avanzate (assunzioni & costi)", expanded=False):
-        colA, colB = st.columns(2)
-        with colA:
-            st.number_input("Finestra ricarica (h)", 4.0, 16.0, 10.0, 0.5, key="Finestra ricarica (h)")
-            st.number_input("Giorni lavorativi/anno", 200, 365, 240, 5, key="Giorni lavorativi/anno")
-            st.number_input("Rotazione AC (auto/punto/g)", 1, 6, 2, 1, key="Rotazione AC (auto/punto/g)")
-            st.number_input("Rotazione DC (auto/punto/g)", 1, 20, 6, 1, key="Rotazione DC (auto/punto/g)")
-            st.number_input("Consumo EV (kWh/km)", 0.10, 0.80, 0.22, 0.01, key="Consumo EV (kWh/km)")
-            st.number_input("Energia interna (€/kWh)", 0.05, 1.50, 0.22, 0.01, key="Energia interna (€/kWh)")
-        with colB:
-            st.number_input("Diesel (km/L)", 5.0, 30.0, 15.0, 0.5, key="Diesel (km/L)")
-            st.number_input("Diesel (€/L)", 0.5, 3.5, 1.75, 0.01, key="Diesel (€/L)")
-            st.number_input("Soglia payback (anni)", 1.0, 10.0, 4.0, 0.5, key="Soglia payback (anni)")
-            st.number_input("Peak factor (× domanda gg)", 1.0, 2.0, 1.25, 0.05, key="Peak factor (× domanda gg)")
-            st.markdown("<div class='hr'></div>", unsafe_allow_html=True)
-            st.caption("Costi hardware (acquisto + installazione)")
-            st.number_input("AC22 acquisto (€)", 0.0, 50000.0, 1500.0, 100.0, key="AC22 acquisto (€)")
-            st.number_input("AC22 install (€)", 0.0, 50000.0, 1600.0, 100.0, key="AC22 install (€)")
-            st.number_input("DC30 acquisto (€)", 0.0, 200000.0, 8500.0, 250.0, key="DC30 acquisto (€)")
-            st.number_input("DC30 install (€)", 0.0, 200000.0, 7500.0, 250.0, key="DC30 install (€)")
-            st.number_input("DC60 acquisto (€)", 0.0, 300000.0, 16000.0, 500.0, key="DC60 acquisto (€)")
-            st.number_input("DC60 install (€)", 0.0, 300000.0, 7500.0, 500.0, key="DC60 install (€)")
-
-    st.markdown("<div class='hr'></div>", unsafe_allow_html=True)
-    st.markdown("**Suggerimento:** per un pitch, mostra GO/NO‑GO + CAPEX + Payback + CO₂ evitata.")
-    st.markdown("<div class='footer'>© eV Field Service • Data-driven fleet electrification</div>", unsafe_allow_html=True)
-
-def _get(label: str, default):
-    return st.session_state.get(label, default)
-
-p = Params(
-    charging_window_hours=_get("Finestra ricarica (h)", 10.0),
-    working_days=_get("Giorni lavorativi/anno", 240),
-    ac_rotation=_get("Rotazione AC (auto/punto/g)", 2),
-    dc_rotation=_get("Rotazione DC (auto/punto/g)", 6),
-    ev_kwh_per_km=_get("Consumo EV (kWh/km)", 0.22),
-    energy_internal_eur_per_kwh=_get("Energia interna (€/kWh)", 0.22),
-    diesel_km_per_l=_get("Diesel (km/L)", 15.0),
-    diesel_eur_per_l=_get("Diesel (€/L)", 1.75),
-    payback_threshold_years=_get("Soglia payback (anni)", 4.0),
-    peak_factor=_get("Peak factor (× domanda gg)", 1.25),
-    ac22_acq_eur=_get("AC22 acquisto (€)", 1500.0),
-    ac22_ins_eur=_get("AC22 install (€)", 1600.0),
-    dc30_acq_eur=_get("DC30 acquisto (€)", 8500.0),
-    dc30_ins_eur=_get("DC30 install (€)", 7500.0),
-    dc60_acq_eur=_get("DC60 acquisto (€)", 16000.0),
-    dc60_ins_eur=_get("DC60 install (€)", 7500.0),
+"""
+
+
+# Chrome statico: stringhe costanti a livello di modulo, nessuna formattazione per rerun
+_HR = "<div class='hr'></div>"
+_CARD_INPUT = "<div class='card'><h3>1) Inserisci i dati minimi</h3><div class='subtle'>Solo 2 variabili: semplicissimo per qualsiasi azienda.</div></div>"
+_CARD_EXAMPLES = "<div class='card'><h3>Esempi rapidi</h3><div class='subtle'>Carica uno scenario tipico in un click.</div></div>"
+_CARD_RESULT = "<div class='card'><h3>2) Risultato</h3><div class='subtle'>Y35 by eV Field Service.</div></div>"
+_PAGE_FOOTER = "<div class='footer'>Tip: per un pitch, screenshot + CSV export → allegato perfetto.</div>"
+_SIDEBAR_FOOTER = (
+    "<div class='hr'></div>"
+    "<p><b>Suggerimento:</b> per un pitch, mostra GO/NO‑GO + CAPEX + Payback + CO₂ evitata.</p>"
+    "<div class='footer'>© eV Field Service • Data-driven fleet electrification</div>"
 )
 
-left, right = st.columns([1, 1], gap="large")
 
-with left:
-    st.markdown("<div class='card'><h3>1) Inserisci i dati minimi</h3><div class='subtle'>Solo 2 variabili: semplicissimo per qualsiasi azienda.</div></div>", unsafe_allow_html=True)
-    st.write("")
-    N = st.number_input("Numero veicoli (N)", min_value=1, max_value=5000, value=int(st.session_state.get("N", 11)), step=1)
-    km = st.number_input("Km annui medi per veicolo", min_value=0, max_value=200000, value=int(st.session_state.get("km", 30000)), step=1000)
+@st.cache_resource(show_spinner=False)
+def _static_block() -> str:
+    # style.css letto dal disco una sola volta per processo, poi servito dalla cache
+    css = Path(__file__).with_name("style.css").read_text(encoding="utf-8")
+    return f"<style>\n{css}</style>\n{_TITLE_BLOCK}"
 
-    c1, c2 = st.columns(2)
-    with c1:
-        run = st.button("Calcola GO/NO‑GO ⚡", use_container_width=True)
-    with c2:
-        reset = st.button("Reset", use_container_width=True)
-        if reset:
-            for k in ["N", "km", "last_result"]:
-                st.session_state.pop(k, None)
-            st.rerun()
 
-    st.write("")
-    st.markdown("<div class='card'><h3>Esempi rapidi</h3><div class='subtle'>Carica uno scenario tipico in un click.</div></div>", unsafe_allow_html=True)
-    ex1, ex2 = st.columns(2)
-    with ex1:
-        if st.button("11 auto • 30.000 km", use_container_width=True):
-            st.session_state["N"] = 11
-            st.session_state["km"] = 30000
-            st.session_state["last_result"] = estimate(11, 30000.0, p)
-    with ex2:
-        if st.button("8 auto • 20.000 km", use_container_width=True):
-            st.session_state["N"] = 8
-            st.session_state["km"] = 20000
-            st.session_state["last_result"] = estimate(8, 20000.0, p)
+def _inject_static():
+    # CSS + hero in un unico delta: Streamlit ripulisce gli elementi non riemessi, quindi vanno inviati a ogni rerun
+    # st.html: HTML statico inserito così com'è, senza passare dal parser markdown
+    st.html(_static_block())
 
-with right:
-    st.markdown("<div class='card'><h3>2) Risultato</h3><div class='subtle'>Y35 by eV Field Service.</div></div>", unsafe_allow_html=True)
-    st.write("")
 
-    if run:
-        st.session_state["N"] = int(N)
-        st.session_state["km"] = int(km)
-        st.session_state["last_result"] = estimate(int(N), float(km), p)
+def _run_and_store(N: int, km: float, p: Params):
+    # Unico punto d'ingresso per Calcola ed Esempi: stesso input del risultato mostrato → niente da fare
+    key = (N, km, p)
+    if st.session_state.get("last_key") == key and "last_result" in st.session_state:
+        return
+    st.session_state["N"] = N
+    st.session_state["km"] = int(km)  # il widget km è intero; al motore va il float
+    st.session_state["last_key"] = key
+    # Un solo livello di cache: lru_cache di processo in engine.estimate (un hit st.cache_data costerebbe di più del kernel)
+    st.session_state["last_result"] = estimate(N, km, p)
 
-    res = st.session_state.get("last_result")
 
-    if not res:
-        st.info("Inserisci i dati e premi **Calcola**. Qui comparirà la decisione GO/NO‑GO con i KPI.")
-    else:
-        decision = res["economics"]["decision"]
-        pb = res["economics"]["payback_years_hw_only"]
-        capex = res["capex"]["capex_eur"]
+def _export_row(res: EstimateResult, p: Params) -> dict:
+    return {
+        "N": res.N,
+        "km_per_vehicle_year": res.km_per_vehicle_year,
+        "km_total_year": res.km_total_year,
+        "working_days": res.working_days,
+        "peak_factor": p.peak_factor,
+        "kwh_total_day_avg": res.kwh_total_day_avg,
+        "kwh_total_day_peak": res.kwh_total_day_peak,
+        "kwh_total_year": res.kwh_total_year,
+        "hardware": res.hardware,
+        "points": res.points,
+        "capex_eur": res.capex_eur,
+        "delta_fossil_year_eur": res.delta_fossil_year_eur,
+        "payback_years_hw_only": res.payback_years_hw_only,
+        "decision": res.decision,
+        "co2_avoided_tons_year": res.co2_avoided_tons_year,
+        "co2_avoided_kg_per_vehicle_year": res.co2_avoided_kg_per_vehicle_year,
+        "co2_avoided_g_per_km": res.co2_avoided_g_per_km,
+        "diesel_avoided_liters_year": res.diesel_avoided_liters_year,
+        "trees_equivalent": res.trees_equivalent,
+        "esg_rating": res.esg_rating,
+    }
 
-        if decision == "GO":
-            st.markdown("<div class='pill good'>✅ GO <span class='subtle'>investimento compatibile con il ritorno</span></div>", unsafe_allow_html=True)
-        else:
-            st.markdown("<div class='pill bad'>⛔ NO‑GO <span class='subtle'>investimento non compatibile con il ritorno</span></div>", unsafe_allow_html=True)
 
-        st.markdown(f"<div class='pill warn'>⚡ Peak-ready +{int((p.peak_factor-1)*100)}% (factor {p.peak_factor:.2f})</div>", unsafe_allow_html=True)
-        st.markdown(f"<div class='pill warn'>📅 {p.working_days} giorni lavorativi/anno</div>", unsafe_allow_html=True)
+def _result_csv_bytes(res: EstimateResult, p: Params) -> bytes:
+    row = _export_row(res, p)
+    # Scrittura diretta in byte (UTF-8) in un solo passaggio, senza la copia str → bytes di .encode()
+    buf = io.BytesIO()
+    text = io.TextIOWrapper(buf, encoding="utf-8", newline="")
+    csv.writer(text, lineterminator="\n").writerows([tuple(row), tuple(row.values())])
+    text.flush()
+    return buf.getvalue()
+
+
+def _fmt_value(v) -> str:
+    if isinstance(v, float):
+        return "∞" if isinf(v) else f"{v:,.2f}"
+    return str(v)
+
+
+def _section_table(res: EstimateResult, name: str):
+    import pandas as pd  # import differito, come nell'Export
+
+    # Valori già formattati come testo: tabella statica campo → valore, senza widget JSON
+    rows = {k: _fmt_value(v) for k, v in res.section(name).items()}
+    return pd.DataFrame.from_dict(rows, orient="index", columns=["valore"])
+
+
+# Etichetta del widget (= chiave in session_state) → campo di Params
+_PARAM_WIDGETS = (
+    ("Finestra ricarica (h)", "charging_window_hours"),
+    ("Giorni lavorativi/anno", "working_days"),
+    ("Rotazione AC (auto/punto/g)", "ac_rotation"),
+    ("Rotazione DC (auto/punto/g)", "dc_rotation"),
+    ("Consumo EV (kWh/km)", "ev_kwh_per_km"),
+    ("Energia interna (€/kWh)", "energy_internal_eur_per_kwh"),
+    ("Diesel (km/L)", "diesel_km_per_l"),
+    ("Diesel (€/L)", "diesel_eur_per_l"),
+    ("Soglia payback (anni)", "payback_threshold_years"),
+    ("Peak factor (× domanda gg)", "peak_factor"),
+    ("AC22 acquisto (€)", "ac22_acq_eur"),
+    ("AC22 install (€)", "ac22_ins_eur"),
+    ("DC30 acquisto (€)", "dc30_acq_eur"),
+    ("DC30 install (€)", "dc30_ins_eur"),
+    ("DC60 acquisto (€)", "dc60_acq_eur"),
+    ("DC60 install (€)", "dc60_ins_eur"),
+)
 
-        def fmt_eur(x): return f"€ {x:,.0f}"
-        def fmt_years(x): return "∞" if x == float("inf") else f"{x:.2f} anni"
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _params_for(values: tuple) -> Params:
+    # Un Params per combinazione di valori della sidebar (frozen: condivisibile tra rerun e sessioni).
+    # Solo i campi che differiscono dai default; se nessuno cambia si riusa il singleton DEFAULT_PARAMS
+    changed = {}
+    for (_, name), value in zip(_PARAM_WIDGETS, values):
+        if value is not None and value != getattr(DEFAULT_PARAMS, name):
+            changed[name] = value
+    return Params(**changed) if changed else DEFAULT_PARAMS
+
+
+_EXPORT_FORMATS = {
+    "capex_eur": "€ {:,.0f}",
+    "delta_fossil_year_eur": "€ {:,.0f}",
+    "payback_years_hw_only": "{:.2f}",
+}
 
-        st.write("")
-        st.markdown("<div class='kpiRow'>", unsafe_allow_html=True)
-        st.markdown(f"""
-          <div class="kpi">
-            <div class="label">CAPEX stimato</div>
-            <div class="value">{fmt_eur(capex)}</div>
-            <div class="hint">acquisto + installazione</div>
-          </div>
-          <div class="kpi">
-            <div class="label">Payback (solo HW)</div>
-            <div class="value">{fmt_years(pb)}</div>
-            <div class="hint">soglia: {p.payback_threshold_years:.1f} anni</div>
-          </div>
-          <div class="kpi">
-            <div class="label">Δ costo energia vs diesel</div>
-            <div class="value">{fmt_eur(res["economics"]["delta_fossil_year_eur"])}/anno</div>
-            <div class="hint">solo energia (no leasing/mnt)</div>
-          </div>
-        """, unsafe_allow_html=True)
-        st.markdown("</div>", unsafe_allow_html=True)
+_PILL_GO = "<div class='pill good'>✅ GO <span class='subtle'>investimento compatibile con il ritorno</span></div>"
+_PILL_NOGO = "<div class='pill bad'>⛔ NO‑GO <span class='subtle'>investimento non compatibile con il ritorno</span></div>"
 
-        st.write("")
-        st.markdown("<div class='kpiRow'>", unsafe_allow_html=True)
-        st.markdown(f"""
-          <div class="kpi">
-            <div class="label">CO₂ evitata</div>
-            <div class="value">{res["esg"]["co2_avoided_tons_year"]:.2f} t/anno</div>
-            <div class="hint">baseline diesel</div>
+# Pannello risultati: stringa normale (non f-string), riempita con format_map; i campi leggono res/p per attributo
+_RESULT_TEMPLATE = """
+          <div class="pills">
+            {decision_pill}
+            <div class="pill warn">⚡ Peak-ready +{peak_pct}% (factor {p.peak_factor:.2f})</div>
+            <div class="pill warn">📅 {p.working_days} giorni lavorativi/anno</div>
           </div>
-          <div class="kpi">
-            <div class="label">CO₂ evitata / veicolo</div>
-            <div class="value">{res["esg"]["co2_avoided_kg_per_vehicle_year"]:.0f} kg/anno</div>
-            <div class="hint">media per veicolo</div>
+          <div class="kpiRow">
+            <div class="kpi">
+              <div class="label">CAPEX stimato</div>
+              <div class="value">{res.capex_fmt}</div>
+              <div class="hint">acquisto + installazione</div>
+            </div>
+            <div class="kpi">
+              <div class="label">Payback (solo HW)</div>
+              <div class="value">{res.payback_fmt}</div>
+              <div class="hint">soglia: {p.payback_threshold_years:.1f} anni</div>
+            </div>
+            <div class="kpi">
+              <div class="label">Δ costo energia vs diesel</div>
+              <div class="value">{res.delta_fossil_year_fmt}/anno</div>
+              <div class="hint">solo energia (no leasing/mnt)</div>
+            </div>
           </div>
-          <div class="kpi">
-            <div class="label">CO₂ evitata / km</div>
-            <div class="value">{res["esg"]["co2_avoided_g_per_km"]:.0f} g/km</div>
-            <div class="hint">intensity</div>
+          <div class="kpiRow">
+            <div class="kpi">
+              <div class="label">CO₂ evitata</div>
+              <div class="value">{res.co2_avoided_tons_year:.2f} t/anno</div>
+              <div class="hint">baseline diesel</div>
+            </div>
+            <div class="kpi">
+              <div class="label">CO₂ evitata / veicolo</div>
+              <div class="value">{res.co2_avoided_kg_per_vehicle_year:.0f} kg/anno</div>
+              <div class="hint">media per veicolo</div>
+            </div>
+            <div class="kpi">
+              <div class="label">CO₂ evitata / km</div>
+              <div class="value">{res.co2_avoided_g_per_km:.0f} g/km</div>
+              <div class="hint">intensity</div>
+            </div>
+            <div class="kpi">
+              <div class="label">Alberi equivalenti</div>
+              <div class="value">🌲 {res.trees_equivalent}</div>
+              <div class="hint">metrica comunicativa</div>
+            </div>
           </div>
-          <div class="kpi">
-            <div class="label">Alberi equivalenti</div>
-            <div class="value">🌲 {res["esg"]["trees_equivalent"]}</div>
-            <div class="hint">metrica comunicativa</div>
+          <div class="kpiRow">
+            <div class="kpi">
+              <div class="label">Domanda (media)</div>
+              <div class="value">{res.kwh_total_day_avg:.1f} kWh/g</div>
+              <div class="hint">su {p.working_days} gg</div>
+            </div>
+            <div class="kpi">
+              <div class="label">Domanda (picco)</div>
+              <div class="value">{res.kwh_total_day_peak:.1f} kWh/g</div>
+              <div class="hint">media × peak</div>
+            </div>
+            <div class="kpi">
+              <div class="label">Diesel evitato</div>
+              <div class="value">{res.diesel_avoided_liters_year:,.0f} L/anno</div>
+              <div class="hint">stima</div>
+            </div>
+            <div class="kpi">
+              <div class="label">Rating ESG</div>
+              <div class="value">{res.esg_rating}</div>
+              <div class="hint">demo</div>
+            </div>
           </div>
-        """, unsafe_allow_html=True)
-        st.markdown("</div>", unsafe_allow_html=True)
+"""
 
-        st.write("")
-        st.markdown("<div class='kpiRow'>", unsafe_allow_html=True)
-        st.markdown(f"""
-          <div class="kpi">
-            <div class="label">Domanda (media)</div>
-            <div class="value">{res["energy"]["kwh_total_day_avg"]:.1f} kWh/g</div>
-            <div class="hint">su {p.working_days} gg</div>
-          </div>
-          <div class="kpi">
-            <div class="label">Domanda (picco)</div>
-            <div class="value">{res["energy"]["kwh_total_day_peak"]:.1f} kWh/g</div>
-            <div class="hint">media × peak</div>
-          </div>
-          <div class="kpi">
-            <div class="label">Diesel evitato</div>
-            <div class="value">{res["esg"]["diesel_avoided_liters_year"]:,.0f} L/anno</div>
-            <div class="hint">stima</div>
-          </div>
-          <div class="kpi">
-            <div class="label">Rating ESG</div>
-            <div class="value">{res["esg"]["esg_rating"]}</div>
-            <div class="hint">demo</div>
-          </div>
-        """, unsafe_allow_html=True)
-        st.markdown("</div>", unsafe_allow_html=True)
+
+@st.fragment
+def _result_panel(p: Params):
+    # Frammento: tab e download rieseguono solo questo pannello, non sidebar/hero/input
+    res = st.session_state.get("last_result")
+
+    if not res:
+        st.info("Inserisci i dati e premi **Calcola**. Qui comparirà la decisione GO/NO‑GO con i KPI.")
+    else:
+        decision_pill = _PILL_GO if res.decision == "GO" else _PILL_NOGO
+
+        # Pill + tutte le righe KPI in un solo st.markdown: un delta unico e i wrapper .kpiRow racchiudono davvero le card
+        st.markdown(_RESULT_TEMPLATE.format_map({
+            "res": res, "p": p, "decision_pill": decision_pill, "peak_pct": int((p.peak_factor - 1) * 100),
+        }), unsafe_allow_html=True)
 
         st.write("")
         tab1, tab2, tab3 = st.tabs(["📌 Dettaglio", "📤 Export", "ℹ️ Metodo"])
@@ -379,45 +236,30 @@ with right:
             c1, c2 = st.columns(2)
             with c1:
                 st.markdown("**Energia**")
-                st.json(res["energy"])
+                st.table(_section_table(res, "energy"))
                 st.markdown("**Sizing**")
-                st.json(res["sizing"])
+                st.table(_section_table(res, "sizing"))
             with c2:
                 st.markdown("**Economics**")
-                st.json(res["economics"])
+                st.table(_section_table(res, "economics"))
                 st.markdown("**ESG**")
-                st.json(res["esg"])
+                st.table(_section_table(res, "esg"))
 
         with tab2:
-            df = pd.DataFrame([{
-                **res["inputs"],
-                "working_days": p.working_days,
-                "peak_factor": p.peak_factor,
-                "kwh_total_day_avg": res["energy"]["kwh_total_day_avg"],
-                "kwh_total_day_peak": res["energy"]["kwh_total_day_peak"],
-                "kwh_total_year": res["energy"]["kwh_total_year"],
-                "hardware": res["sizing"]["hardware"],
-                "points": res["sizing"]["points"],
-                "capex_eur": res["capex"]["capex_eur"],
-                "delta_fossil_year_eur": res["economics"]["delta_fossil_year_eur"],
-                "payback_years_hw_only": pb,
-                "decision": decision,
-                "co2_avoided_tons_year": res["esg"]["co2_avoided_tons_year"],
-                "co2_avoided_kg_per_vehicle_year": res["esg"]["co2_avoided_kg_per_vehicle_year"],
-                "co2_avoided_g_per_km": res["esg"]["co2_avoided_g_per_km"],
-                "diesel_avoided_liters_year": res["esg"]["diesel_avoided_liters_year"],
-                "trees_equivalent": res["esg"]["trees_equivalent"],
-                "esg_rating": res["esg"]["esg_rating"],
-            }])
-            st.dataframe(df, use_container_width=True)
-            csv = df.to_csv(index=False).encode("utf-8")
-            st.download_button("Scarica risultati (CSV)", data=csv, file_name="ev_go_nogo_results.csv", mime="text/csv", use_container_width=True)
+            import pandas as pd  # import differito: serve solo per l'anteprima dell'export
+
+            # Formattazione vettoriale dello Styler (per colonna), non lambda per cella
+            preview = pd.DataFrame([_export_row(res, p)]).style.format(_EXPORT_FORMATS)
+            st.dataframe(preview, use_container_width=True)
+            st.download_button("Scarica risultati (CSV)", data=_result_csv_bytes(res, p), file_name="ev_go_nogo_results.csv", mime="text/csv", use_container_width=True)
 
         with tab3:
-            st.markdown("""
+            # Soglie hardware dai Params correnti: il limite DC60 è max(limite AC, soglia DC60), non 90 fisso
+            st.markdown(f"""
 **Metodo:**
 - Domanda media = `KM / giorni_lavorativi × consumo × N` (default **240 gg**)
 - Domanda picco = `media × peak factor` (default **1.25**)
+- Hardware: AC finché `kWh/veicolo/g ≤ potenza AC × finestra / rotazione AC` (ora **{p.ac_breakpoint_kwh_per_vehicle_day:g} kWh/g**), poi DC30; oltre `max(limite AC, {p.dc60_threshold_kwh_per_vehicle_day:g})` = **{p.dc60_breakpoint_kwh_per_vehicle_day:g} kWh/g** DC60 (se i due limiti coincidono, DC30 non viene mai scelto)
 - Dimensionamento punti: `max(rotazione, energia su picco)`
 - CAPEX = (acquisto + installazione) × punti
 - ESG: CO₂ evitata (totale / veicolo / km), diesel evitato, alberi equivalenti.
@@ -425,4 +267,83 @@ with right:
 > Economico: “solo energia” (no leasing/manutenzione).
 """)
 
-st.markdown("<div class='footer'>Tip: per un pitch, screenshot + CSV export → allegato perfetto.</div>", unsafe_allow_html=True)
+
+_inject_static()
+st.write("")
+
+with st.sidebar:
+    st.header("🧩 Impostazioni")
+    st.caption("Per una demo semplice, lascia i default. Apri *Avanzate* solo se vuoi rifinire le assunzioni, poi premi *Applica*.")
+    # Form: le modifiche alle assunzioni vengono applicate tutte insieme al submit (un solo rerun)
+    with st.form("params", border=False):
+        with st.expander("Avanzate (assunzioni & costi)", expanded=False):
+            colA, colB = st.columns(2)
+            with colA:
+                st.number_input("Finestra ricarica (h)", 4.0, 16.0, 10.0, 0.5, key="Finestra ricarica (h)")
+                st.number_input("Giorni lavorativi/anno", 200, 365, 240, 5, key="Giorni lavorativi/anno")
+                st.number_input("Rotazione AC (auto/punto/g)", 1, 6, 2, 1, key="Rotazione AC (auto/punto/g)")
+                st.number_input("Rotazione DC (auto/punto/g)", 1, 20, 6, 1, key="Rotazione DC (auto/punto/g)")
+                st.number_input("Consumo EV (kWh/km)", 0.10, 0.80, 0.22, 0.01, key="Consumo EV (kWh/km)")
+                st.number_input("Energia interna (€/kWh)", 0.05, 1.50, 0.22, 0.01, key="Energia interna (€/kWh)")
+            with colB:
+                st.number_input("Diesel (km/L)", 5.0, 30.0, 15.0, 0.5, key="Diesel (km/L)")
+                st.number_input("Diesel (€/L)", 0.5, 3.5, 1.75, 0.01, key="Diesel (€/L)")
+                st.number_input("Soglia payback (anni)", 1.0, 10.0, 4.0, 0.5, key="Soglia payback (anni)")
+                st.number_input("Peak factor (× domanda gg)", 1.0, 2.0, 1.25, 0.05, key="Peak factor (× domanda gg)")
+                st.html(_HR)
+                st.caption("Costi hardware (acquisto + installazione)")
+                st.number_input("AC22 acquisto (€)", 0.0, 50000.0, 1500.0, 100.0, key="AC22 acquisto (€)")
+                st.number_input("AC22 install (€)", 0.0, 50000.0, 1600.0, 100.0, key="AC22 install (€)")
+                st.number_input("DC30 acquisto (€)", 0.0, 200000.0, 8500.0, 250.0, key="DC30 acquisto (€)")
+                st.number_input("DC30 install (€)", 0.0, 200000.0, 7500.0, 250.0, key="DC30 install (€)")
+                st.number_input("DC60 acquisto (€)", 0.0, 300000.0, 16000.0, 500.0, key="DC60 acquisto (€)")
+                st.number_input("DC60 install (€)", 0.0, 300000.0, 7500.0, 500.0, key="DC60 install (€)")
+        st.form_submit_button("Applica", use_container_width=True)
+
+    st.html(_SIDEBAR_FOOTER)
+
+def _build_params() -> Params:
+    return _params_for(tuple(st.session_state.get(label) for label, _ in _PARAM_WIDGETS))
+
+
+p = _build_params()
+
+left, right = st.columns([1, 1], gap="large")
+
+with left:
+    st.html(_CARD_INPUT)
+    st.write("")
+    N = st.number_input("Numero veicoli (N)", min_value=1, max_value=5000, value=st.session_state.setdefault("N", 11), step=1)
+    km = st.number_input("Km annui medi per veicolo", min_value=0, max_value=200000, value=st.session_state.setdefault("km", 30000), step=1000)
+
+    c1, c2 = st.columns(2)
+    with c1:
+        run = st.button("Calcola GO/NO‑GO ⚡", use_container_width=True)
+    with c2:
+        reset = st.button("Reset", use_container_width=True)
+        if reset:
+            for k in ["N", "km", "last_key", "last_result"]:
+                st.session_state.pop(k, None)
+            st.rerun()
+
+    st.write("")
+    st.html(_CARD_EXAMPLES)
+    ex1, ex2 = st.columns(2)
+    with ex1:
+        if st.button("11 auto • 30.000 km", use_container_width=True):
+            _run_and_store(11, 30000.0, p)
+    with ex2:
+        if st.button("8 auto • 20.000 km", use_container_width=True):
+            _run_and_store(8, 20000.0, p)
+
+with right:
+    st.html(_CARD_RESULT)
+    st.write("")
+
+    if run:
+        # number_input con min/value/step interi restituisce già int: niente cast
+        _run_and_store(N, float(km), p)
+
+    _result_panel(p)
+
+st.html(_PAGE_FOOTER)
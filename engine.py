@@ -0,0 +1,380 @@
+"""Motore di calcolo GO/NO-GO, separato dalla UI Streamlit.
+
+Vive in un modulo importato (non nello script) perché Streamlit riesegue app.py
+a ogni interazione: qui classi e kernel JIT vengono creati una sola volta per processo.
+"""
+from math import ceil, inf, isinf
+from dataclasses import dataclass, field
+from functools import lru_cache
+from operator import index
+
+try:
+    from numba import njit
+except ImportError:  # numba è opzionale: senza, il kernel gira in Python puro
+    def njit(*args, **kwargs):
+        return lambda fn: fn
+
+
+@dataclass(frozen=True, slots=True)
+class Params:
+    charging_window_hours: float = 10.0
+    working_days: int = 240
+
+    ac_rotation: int = 2
+    dc_rotation: int = 6
+
+    ac_power_effective_kw: float = 11.0
+    dc30_power_kw: float = 30.0
+    dc60_power_kw: float = 60.0
+
+    ac22_acq_eur: float = 1500.0
+    ac22_ins_eur: float = 1600.0
+    dc30_acq_eur: float = 8500.0
+    dc30_ins_eur: float = 7500.0
+    dc60_acq_eur: float = 16000.0
+    dc60_ins_eur: float = 7500.0
+
+    ev_kwh_per_km: float = 0.22
+    energy_internal_eur_per_kwh: float = 0.22
+
+    diesel_km_per_l: float = 15.0
+    diesel_eur_per_l: float = 1.75
+    diesel_kgco2_per_l: float = 2.65
+
+    trees_per_ton_co2: int = 50
+    payback_threshold_years: float = 4.0
+
+    peak_factor: float = 1.25
+
+    # Oltre questa domanda per veicolo (kWh/g) si passa da DC30 a DC60
+    dc60_threshold_kwh_per_vehicle_day: float = 90.0
+
+    # Costanti derivate, calcolate una volta per istanza (Params è immutabile)
+    ac22_total: float = field(init=False, repr=False, compare=False)
+    dc30_total: float = field(init=False, repr=False, compare=False)
+    dc60_total: float = field(init=False, repr=False, compare=False)
+    kwh_ac_day: float = field(init=False, repr=False, compare=False)
+    kwh_dc30_day: float = field(init=False, repr=False, compare=False)
+    kwh_dc60_day: float = field(init=False, repr=False, compare=False)
+    hw_table: tuple = field(init=False, repr=False, compare=False)
+    ac_breakpoint_kwh_per_vehicle_day: float = field(init=False, repr=False, compare=False)
+    dc60_breakpoint_kwh_per_vehicle_day: float = field(init=False, repr=False, compare=False)
+    kernel_args: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        ac22_total = self.ac22_acq_eur + self.ac22_ins_eur
+        dc30_total = self.dc30_acq_eur + self.dc30_ins_eur
+        dc60_total = self.dc60_acq_eur + self.dc60_ins_eur
+        kwh_ac_day = self.ac_power_effective_kw * self.charging_window_hours
+        kwh_dc30_day = self.dc30_power_kw * self.charging_window_hours
+        kwh_dc60_day = self.dc60_power_kw * self.charging_window_hours
+
+        object.__setattr__(self, "ac22_total", ac22_total)
+        object.__setattr__(self, "dc30_total", dc30_total)
+        object.__setattr__(self, "dc60_total", dc60_total)
+        object.__setattr__(self, "kwh_ac_day", kwh_ac_day)
+        object.__setattr__(self, "kwh_dc30_day", kwh_dc30_day)
+        object.__setattr__(self, "kwh_dc60_day", kwh_dc60_day)
+        # (etichetta, kWh/stazione/g, rotazione auto/punto/g, costo unitario acquisto + installazione)
+        object.__setattr__(self, "hw_table", (
+            ("AC 22kW (eff. 11kW)", kwh_ac_day, self.ac_rotation, ac22_total),
+            ("DC 30kW", kwh_dc30_day, self.dc_rotation, dc30_total),
+            ("DC 60kW", kwh_dc60_day, self.dc_rotation, dc60_total),
+        ))
+
+        # Soglia AC/DC = energia che un punto AC eroga a ciascun veicolo della sua rotazione (55 kWh/g con i default).
+        # La soglia DC60 non scende mai sotto quella AC, così chi sta in AC non finisce in DC60.
+        ac_breakpoint = kwh_ac_day / self.ac_rotation
+        object.__setattr__(self, "ac_breakpoint_kwh_per_vehicle_day", ac_breakpoint)
+        object.__setattr__(self, "dc60_breakpoint_kwh_per_vehicle_day", max(ac_breakpoint, self.dc60_threshold_kwh_per_vehicle_day))
+
+        # Argomenti del kernel impacchettati una volta sola, non a ogni estimate()
+        object.__setattr__(self, "kernel_args", _params_vector(self))
+
+
+ESG_LABELS = ("B", "A", "AA", "AAA")
+# Soglie (t CO₂/anno) ordinate: il rating è il numero di soglie raggiunte, indice in ESG_LABELS
+ESG_THRESHOLDS_T = (1.0, 3.0, 10.0)
+
+# Raggruppamento dei campi di EstimateResult per i pannelli di dettaglio
+RESULT_SECTIONS = {
+    "energy": ("working_days", "kwh_per_vehicle_day", "kwh_total_day_avg", "kwh_total_day_peak", "kwh_total_year"),
+    "sizing": ("hardware", "points", "by_rotation", "by_energy", "kwh_per_station_day"),
+    "economics": ("diesel_cost_year_eur", "ev_energy_cost_year_eur", "delta_fossil_year_eur", "payback_years_hw_only", "decision"),
+    "esg": (
+        "diesel_avoided_liters_year", "co2_avoided_tons_year", "co2_avoided_kg_per_vehicle_year",
+        "co2_avoided_g_per_km", "trees_equivalent", "esg_rating",
+    ),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class EstimateResult:
+    # Input
+    N: int
+    km_per_vehicle_year: float
+    km_total_year: float
+
+    # Energia
+    working_days: int
+    kwh_per_vehicle_day: float
+    kwh_total_day_avg: float
+    kwh_total_day_peak: float
+    kwh_total_year: float
+
+    # Sizing + CAPEX
+    hardware: str
+    points: int
+    by_rotation: int
+    by_energy: int
+    kwh_per_station_day: float
+    capex_eur: float
+
+    # Economics
+    diesel_cost_year_eur: float
+    ev_energy_cost_year_eur: float
+    delta_fossil_year_eur: float
+    payback_years_hw_only: float
+    decision: str
+
+    # ESG
+    diesel_avoided_liters_year: float
+    co2_avoided_tons_year: float
+    co2_avoided_kg_per_vehicle_year: float
+    co2_avoided_g_per_km: float
+    trees_equivalent: int
+    esg_rating: str
+
+    # Stringhe pronte per la UI, formattate una volta sola alla costruzione
+    capex_fmt: str = field(init=False, repr=False, compare=False)
+    delta_fossil_year_fmt: str = field(init=False, repr=False, compare=False)
+    payback_fmt: str = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "capex_fmt", f"€ {self.capex_eur:,.0f}")
+        object.__setattr__(self, "delta_fossil_year_fmt", f"€ {self.delta_fossil_year_eur:,.0f}")
+        object.__setattr__(self, "payback_fmt", "∞" if isinf(self.payback_years_hw_only) else f"{self.payback_years_hw_only:.2f} anni")
+
+    def section(self, name: str) -> dict:
+        return {k: getattr(self, k) for k in RESULT_SECTIONS[name]}
+
+
+def _params_vector(p: Params):
+    # Params -> (tupla di float, tupla di interi) nell'ordine atteso da _estimate_core
+    return (
+        float(p.working_days), p.ev_kwh_per_km, p.peak_factor,
+        p.ac_breakpoint_kwh_per_vehicle_day, p.dc60_breakpoint_kwh_per_vehicle_day,
+        p.kwh_ac_day, p.kwh_dc30_day, p.kwh_dc60_day,
+        p.ac22_total, p.dc30_total, p.dc60_total,
+        p.diesel_km_per_l, p.diesel_eur_per_l, p.energy_internal_eur_per_kwh,
+        p.payback_threshold_years, p.diesel_kgco2_per_l, float(p.trees_per_ton_co2),
+    ), (p.ac_rotation, p.dc_rotation)
+
+
+# Istanza condivisa per il caso comune "tutti i default", creata una volta per processo
+DEFAULT_PARAMS = Params()
+
+
+@njit("UniTuple(i8, 3)(i8, f8, i8, f8)", cache=True)
+def _size(N, kwh_total_day, rotation, kwh_per_station_day):
+    # Punti di ricarica = max(vincolo di rotazione, vincolo di energia sul giorno di picco)
+    q_by_rotation = -(-N // rotation)  # ceil intero: operandi interi, niente divisione float
+    # kwh_per_station_day > 0 e kwh_total_day >= 0: ceil(0 / x) = 0, nessuna guardia necessaria
+    q_by_energy = int(ceil(kwh_total_day / kwh_per_station_day))  # operandi float: ceil resta, int() fissa il tipo i8
+    return max(q_by_rotation, q_by_energy), q_by_rotation, q_by_energy
+
+
+# Firma esplicita: compilazione eager all'import, niente type inference alla prima chiamata
+_CORE_SIGNATURE = (
+    "Tuple((f8, f8, f8, f8, f8, i8, i8, i8, i8, f8, f8, f8, f8, f8, f8, f8, b1, f8, f8, f8, i8, i8))"
+    "(i8, f8, UniTuple(f8, 17), UniTuple(i8, 2))"
+)
+
+
+@njit(_CORE_SIGNATURE, cache=True)
+def _estimate_core(N, km_per_vehicle_year, pv, pi):
+    (working_days, ev_kwh_per_km, peak_factor,
+     ac_breakpoint, dc60_breakpoint,
+     kwh_ac_day, kwh_dc30_day, kwh_dc60_day,
+     ac22_total, dc30_total, dc60_total,
+     diesel_km_per_l, diesel_eur_per_l, energy_internal_eur_per_kwh,
+     payback_threshold_years, diesel_kgco2_per_l, trees_per_ton_co2) = pv
+    ac_rotation, dc_rotation = pi
+
+    km_total_year = N * km_per_vehicle_year
+    kwh_total_year = km_total_year * ev_kwh_per_km
+
+    # Giorno medio (su giorni lavorativi)
+    kwh_per_vehicle_day = km_per_vehicle_year / working_days * ev_kwh_per_km
+    kwh_total_day_avg = N * kwh_per_vehicle_day
+    kwh_total_day_peak = kwh_total_day_avg * peak_factor
+
+    # Selezione hardware senza rami: 0 = AC, 1 = DC30, 2 = DC60
+    idx = int(kwh_per_vehicle_day > ac_breakpoint) + int(kwh_per_vehicle_day > dc60_breakpoint)
+    kwh_per_station_day = (kwh_ac_day, kwh_dc30_day, kwh_dc60_day)[idx]
+    rotation = (ac_rotation, dc_rotation, dc_rotation)[idx]
+    unit_cost = (ac22_total, dc30_total, dc60_total)[idx]
+
+    q, q_by_rotation, q_by_energy = _size(N, kwh_total_day_peak, rotation, kwh_per_station_day)
+    capex = q * unit_cost
+
+    # Economics (solo energia interna)
+    diesel_liters_year = km_total_year / diesel_km_per_l if diesel_km_per_l > 0 else 0.0
+    diesel_cost_year = diesel_liters_year * diesel_eur_per_l
+    ev_energy_cost_year = kwh_total_year * energy_internal_eur_per_kwh
+    delta_fossil_year = diesel_cost_year - ev_energy_cost_year
+
+    payback_years = (capex / delta_fossil_year) if delta_fossil_year > 0 else inf
+    go = delta_fossil_year > 0 and payback_years <= payback_threshold_years
+
+    # ESG KPIs (baseline diesel, in questa versione "light")
+    co2_avoided_tons_year = (diesel_liters_year * diesel_kgco2_per_l) / 1000.0
+    co2_avoided_kg_year = co2_avoided_tons_year * 1000.0
+    co2_avoided_kg_per_vehicle_year = co2_avoided_kg_year / N
+    co2_avoided_g_per_km = (co2_avoided_kg_year * 1000.0) / km_total_year if km_total_year > 0 else 0.0
+    trees_equivalent = int(co2_avoided_tons_year * trees_per_ton_co2)
+    # Indice in ESG_LABELS: B < 1 t, A < 3 t, AA < 10 t, AAA oltre
+    esg_code = (
+        int(co2_avoided_tons_year >= ESG_THRESHOLDS_T[0])
+        + int(co2_avoided_tons_year >= ESG_THRESHOLDS_T[1])
+        + int(co2_avoided_tons_year >= ESG_THRESHOLDS_T[2])
+    )
+
+    return (
+        km_total_year, kwh_per_vehicle_day, kwh_total_day_avg, kwh_total_day_peak, kwh_total_year,
+        idx, q, q_by_rotation, q_by_energy, kwh_per_station_day, capex,
+        diesel_liters_year, diesel_cost_year, ev_energy_cost_year, delta_fossil_year, payback_years, go,
+        co2_avoided_tons_year, co2_avoided_kg_per_vehicle_year, co2_avoided_g_per_km, trees_equivalent, esg_code,
+    )
+
+
+def estimate(N: int, km_per_vehicle_year: float, p: Params) -> "EstimateResult":
+    # km normalizzato a float prima della cache: 30000 e 30000.0 condividono la entry di lru_cache,
+    # quindi il tipo di km_per_vehicle_year nel risultato non deve dipendere dal primo chiamante.
+    # N deve essere intero (index() rifiuta 11.9): il kernel i8 lo troncherebbe, il fallback Python no
+    return _estimate(index(N), float(km_per_vehicle_year), p)
+
+
+# Funzione pura di (N, km, Params) e risultato immutabile: memoizzabile a livello di processo
+@lru_cache(maxsize=256)
+def _estimate(N: int, km_per_vehicle_year: float, p: Params) -> "EstimateResult":
+    if N < 0:
+        raise ValueError(f"N deve essere >= 0, ricevuto {N}")
+    if N == 0:
+        # Flotta vuota: niente da dimensionare, e il kernel dividerebbe per N
+        return _empty_result(km_per_vehicle_year, p)
+
+    (km_total_year, kwh_per_vehicle_day, kwh_total_day_avg, kwh_total_day_peak, kwh_total_year,
+     idx, q, q_by_rotation, q_by_energy, kwh_per_station_day, capex,
+     diesel_liters_year, diesel_cost_year, ev_energy_cost_year, delta_fossil_year, payback_years, go,
+     co2_avoided_tons_year, co2_avoided_kg_per_vehicle_year, co2_avoided_g_per_km, trees_equivalent,
+     esg_code) = _estimate_core(N, km_per_vehicle_year, *p.kernel_args)
+
+    # Costruzione posizionale (ordine dei campi di EstimateResult): evita il binding per keyword di 25 argomenti
+    return EstimateResult(
+        N, km_per_vehicle_year, km_total_year,
+        p.working_days, kwh_per_vehicle_day, kwh_total_day_avg, kwh_total_day_peak, kwh_total_year,
+        p.hw_table[idx][0], q, q_by_rotation, q_by_energy, kwh_per_station_day, capex,
+        diesel_cost_year, ev_energy_cost_year, delta_fossil_year, payback_years, "GO" if go else "NO-GO",
+        diesel_liters_year, co2_avoided_tons_year, co2_avoided_kg_per_vehicle_year, co2_avoided_g_per_km,
+        trees_equivalent, ESG_LABELS[esg_code],
+    )
+
+
+def _empty_result(km_per_vehicle_year: float, p: Params) -> "EstimateResult":
+    # Risultato per N == 0: nessuna stazione, nessun risparmio, NO-GO (payback infinito).
+    # I campi per veicolo dipendono solo da km e restano calcolati, come in estimate_batch.
+    kwh_per_vehicle_day = km_per_vehicle_year / p.working_days * p.ev_kwh_per_km
+    idx = (int(kwh_per_vehicle_day > p.ac_breakpoint_kwh_per_vehicle_day)
+           + int(kwh_per_vehicle_day > p.dc60_breakpoint_kwh_per_vehicle_day))
+    return EstimateResult(
+        0, km_per_vehicle_year, 0.0,
+        p.working_days, kwh_per_vehicle_day, 0.0, 0.0, 0.0,
+        p.hw_table[idx][0], 0, 0, 0, p.hw_table[idx][1], 0.0,
+        0.0, 0.0, 0.0, inf, "NO-GO",
+        0.0, 0.0, 0.0, 0.0,
+        0, ESG_LABELS[0],
+    )
+
+
+def estimate_batch(N_arr, km_arr, p: Params) -> dict:
+    # Stessa logica di estimate(), vettorizzata su array (broadcast N × km) per sweep/sensitività.
+    # Restituisce un array per ciascun campo di EstimateResult.
+    import numpy as np  # import differito: serve solo agli sweep, non al percorso scalare della UI
+
+    # N intero come nel percorso scalare: niente cast silenzioso da float, i conteggi restano int64
+    N_arr = np.asarray(N_arr)
+    if N_arr.dtype.kind not in "iu":
+        raise TypeError(f"N deve essere un array di interi, ricevuto dtype {N_arr.dtype}")
+    N, km = np.broadcast_arrays(N_arr.astype(np.int64), np.asarray(km_arr, dtype=float))
+    if (N < 0).any():
+        raise ValueError(f"N deve essere >= 0, ricevuto {N.min()}")
+
+    km_total_year = N * km
+    kwh_total_year = km_total_year * p.ev_kwh_per_km
+    kwh_per_vehicle_day = km / float(p.working_days) * p.ev_kwh_per_km
+    kwh_total_day_avg = N * kwh_per_vehicle_day
+    kwh_total_day_peak = kwh_total_day_avg * p.peak_factor
+
+    # Stessa tabella hardware del percorso scalare: indice 0/1/2 = breakpoint superati (searchsorted, side="left"
+    # conta quelli strettamente minori), poi fancy-indexing per colonna
+    breakpoints = (p.ac_breakpoint_kwh_per_vehicle_day, p.dc60_breakpoint_kwh_per_vehicle_day)
+    idx = np.searchsorted(breakpoints, kwh_per_vehicle_day, side="left")
+    labels, station_kwh, rotations, unit_costs = (np.array(col) for col in zip(*p.hw_table))
+
+    hardware = labels[idx]
+    kwh_per_station_day = station_kwh[idx]
+    rotation = rotations[idx]
+    unit_cost = unit_costs[idx]
+
+    q_by_rotation = -(-N // rotation)
+    q_by_energy = np.ceil(kwh_total_day_peak / kwh_per_station_day).astype(np.int64)
+    q = np.maximum(q_by_rotation, q_by_energy)
+    capex = q * unit_cost
+
+    # Economics (solo energia interna)
+    diesel_liters_year = km_total_year / p.diesel_km_per_l if p.diesel_km_per_l > 0 else np.zeros_like(km_total_year)
+    diesel_cost_year = diesel_liters_year * p.diesel_eur_per_l
+    ev_energy_cost_year = kwh_total_year * p.energy_internal_eur_per_kwh
+    delta_fossil_year = diesel_cost_year - ev_energy_cost_year
+    with np.errstate(divide="ignore", invalid="ignore"):
+        payback_years = np.where(delta_fossil_year > 0, capex / delta_fossil_year, np.inf)
+    go = (delta_fossil_year > 0) & (payback_years <= p.payback_threshold_years)
+
+    # ESG KPIs
+    co2_avoided_tons_year = (diesel_liters_year * p.diesel_kgco2_per_l) / 1000.0
+    co2_avoided_kg_year = co2_avoided_tons_year * 1000.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        co2_avoided_kg_per_vehicle_year = np.where(N > 0, co2_avoided_kg_year / N, 0.0)
+        co2_avoided_g_per_km = np.where(km_total_year > 0, (co2_avoided_kg_year * 1000.0) / km_total_year, 0.0)
+    trees_equivalent = (co2_avoided_tons_year * p.trees_per_ton_co2).astype(np.int64)
+    # side="right": soglie <= valore, come i >= del kernel
+    esg_rating = np.array(ESG_LABELS)[np.searchsorted(ESG_THRESHOLDS_T, co2_avoided_tons_year, side="right")]
+
+    return {
+        "N": N.copy(),  # broadcast_arrays restituisce viste (stride 0) sull'input del chiamante
+        "km_per_vehicle_year": km.copy(),
+        "km_total_year": km_total_year,
+        "working_days": np.full_like(N, p.working_days),
+        "kwh_per_vehicle_day": kwh_per_vehicle_day,
+        "kwh_total_day_avg": kwh_total_day_avg,
+        "kwh_total_day_peak": kwh_total_day_peak,
+        "kwh_total_year": kwh_total_year,
+        "hardware": hardware,
+        "points": q,
+        "by_rotation": q_by_rotation,
+        "by_energy": q_by_energy,
+        "kwh_per_station_day": kwh_per_station_day,
+        "capex_eur": capex,
+        "diesel_cost_year_eur": diesel_cost_year,
+        "ev_energy_cost_year_eur": ev_energy_cost_year,
+        "delta_fossil_year_eur": delta_fossil_year,
+        "payback_years_hw_only": payback_years,
+        "decision": np.where(go, "GO", "NO-GO"),
+        "diesel_avoided_liters_year": diesel_liters_year,
+        "co2_avoided_tons_year": co2_avoided_tons_year,
+        "co2_avoided_kg_per_vehicle_year": co2_avoided_kg_per_vehicle_year,
+        "co2_avoided_g_per_km": co2_avoided_g_per_km,
+        "trees_equivalent": trees_equivalent,
+        "esg_rating": esg_rating,
+    }